@@ -13,8 +13,11 @@ def _bindParams(program: Program, *params, **namedparams) -> None:
     """
     for i, p in enumerate(params):
         p.bindParameter(program, i)
-    
-    names = [b.name for b in program.bindings]
+
+    # querying the bindings is only needed for named params
+    if not namedparams:
+        return
+    names = {b.name for b in program.bindings}
     for name, p in namedparams.items():
         if name not in names:
             continue
@@ -21,7 +21,7 @@ from hephaistos import (
     updateTensor,
 )
 from hephaistos.util import StructureTensor
-from numpy import frombuffer, float32
+from numpy import dtype as npdtype, frombuffer, float32
 
 from numpy.typing import DTypeLike, NDArray
 from typing import (
@@ -274,6 +274,8 @@ class RetrieveTensorStage(PipelineStage):
         # create byte array to mimic std::span<std::byte>
         span = c_uint8 * src.size_bytes
         self._data = [span.from_address(buf.address) for buf in self._buffers]
+        # views are created once per configuration and type
+        self._views: Dict[Tuple[int, npdtype], NDArray] = {}
 
     @property
     def src(self) -> Tensor:
@@ -290,7 +292,11 @@ class RetrieveTensorStage(PipelineStage):
 
     def view(self, i: int, dtype: DTypeLike = float32) -> NDArray:
         """Interprets the retrieved tensor as array of given type"""
-        return frombuffer(self._data[i], dtype)
+        key = (i, npdtype(dtype))
+        view = self._views.get(key)
+        if view is None:
+            view = self._views[key] = frombuffer(self._data[i], key[1])
+        return view
 
     def run(self, i: int) -> List[Command]:
         return [retrieveTensor(self._src, self._buffers[i])]
@@ -316,6 +322,8 @@ class UpdateTensorStage(PipelineStage):
         # create byte array to mimic std::span<std::byte>
         span = c_uint8 * dst.size_bytes
         self._data = [span.from_address(buf.address) for buf in self._buffers]
+        # views are created once per configuration and type
+        self._views: Dict[Tuple[int, npdtype], NDArray] = {}
 
     @property
     def dst(self) -> Tensor:
@@ -332,7 +340,11 @@ class UpdateTensorStage(PipelineStage):
 
     def view(self, i: int, dtype: DTypeLike = float32) -> NDArray:
         """Interprets the retrieved tensor as array of given type"""
-        return frombuffer(self._data[i], dtype)
+        key = (i, npdtype(dtype))
+        view = self._views.get(key)
+        if view is None:
+            view = self._views[key] = frombuffer(self._data[i], key[1])
+        return view
 
     def run(self, i: int) -> List[Command]:
         return [updateTensor(self._buffers[i], self._dst)]
@@ -2155,6 +2155,20 @@ class Program:
             Byte code of the program
         """
         ...
+    @overload
+    def __init__(self, code: numpy.typing.NDArray) -> None:
+        """
+        Creates a new program using the shader's byte code stored in a
+        contiguous uint32 array without copying it first. Other data types are
+        rejected. Wrap raw bytes or memory mapped files using
+        `np.frombuffer(code, np.uint32)`.
+
+        Parameters
+        ----------
+        code: NDArray[uint32]
+            Byte code of the program
+        """
+        ...
     def bindParams(*params, **namedparams) -> None:
         """
         Binds the given parameters.
@@ -1,18 +1,54 @@
 from __future__ import annotations
 
+import json
+import mmap
 import numpy as np
 import warnings
+from collections import namedtuple
 from contextlib import ExitStack
-
-from ctypes import Structure, c_uint32, pointer, sizeof
-from hephaistos import Buffer, ByteTensor, Command, RawBuffer, Tensor, clearTensor
+from functools import lru_cache
+from math import gcd
+
+from ctypes import (
+    Structure,
+    addressof,
+    alignment,
+    c_ubyte,
+    c_uint32,
+    memmove,
+    sizeof,
+)
+from hephaistos import (
+    Buffer,
+    ByteTensor,
+    Command,
+    Compiler,
+    Program,
+    RawBuffer,
+    Tensor,
+    UnsignedIntTensor,
+    clearTensor,
+)
 from hephaistos.util import printSize
+from io import UnsupportedOperation
 from numpy import ndarray
-from numpy.ctypeslib import as_array
+from numpy.lib.format import descr_to_dtype, dtype_to_descr
 
 from numpy.typing import NDArray
 from os import PathLike
-from typing import Any, BinaryIO, Dict, Optional, Set, Type, Union
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    FrozenSet,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
 
 class QueueView:
@@ -29,6 +65,13 @@ class QueueView:
 
     where `N` is the specified capacity.
 
+    Each field array can optionally be padded such that its size in bytes is a
+    multiple of `align`. The header and counter are padded as well, i.e. each
+    field starts at an offset that is a multiple of `align` allowing fully
+    coalesced memory access on the GPU. Shaders must account for the padding
+    after the counter and use the padded array sizes reported by
+    `fieldCapacity()` in that case.
+
     Parameters
     ----------
     data: int
@@ -42,6 +85,9 @@ class QueueView:
         Whether the queue should omit its counter
     header: Structure | None, default=None
         Optional header prefixing the queue
+    align: int, default=1
+        Alignment in bytes each field array is padded to. A value of 1 disables
+        padding.
     
     Note
     ----
@@ -52,6 +98,18 @@ class QueueView:
     Counter = c_uint32
     """Type of the queue counter"""
 
+    __slots__ = (
+        "_item",
+        "_capacity",
+        "_align",
+        "_counter",
+        "_header",
+        "_data",
+        "_fields",
+        "_field_meta",
+        "_field_names",
+    )
+
     def __init__(
         self,
         data: int,
@@ -60,12 +118,16 @@ class QueueView:
         *,
         skipCounter: bool = False,
         header: Optional[Type[Structure]] = None,
+        align: int = 1,
     ) -> None:
         # store item type
         self._item = item
         self._capacity = capacity
+        self._align = align
         self._counter = None
         self._header = None
+        # data starts after header and counter padded to align
+        start = data + _prefixSize(header, skipCounter, align)
         # check if we have header
         if header is not None:
             self._header = header.from_address(data)
@@ -73,36 +135,41 @@ class QueueView:
         # check if we need counter
         if not skipCounter:
             self._counter = self.Counter.from_address(data)
-            data += sizeof(self.Counter)
-
-        # create SoA and use it to create data access
-        class SoA(Structure):
-            _fields_ = [
-                (
-                    (name, t._type_ * capacity * t._length_)  # handle arrays
-                    if hasattr(t, "_length_")  # check if array
-                    else (name, t * capacity)
-                )  # handle scalar
-                for name, t in item._fields_  # iterate over all fields
-            ]
-
-        self._data = SoA.from_address(data)
-        # create arrays for each field
-        self._fields = {
+        data = start
+
+        # describe the whole SoA as a single structured array element
+        dtype = _soaDtype(item, capacity, align)
+        memory = (c_ubyte * dtype.itemsize).from_address(data)
+        self._data = np.frombuffer(memory, dtype, count=1)
+        # arrays for each field are created lazily on first access
+        self._fields = {}
+        # field types and names are shared by all views of the same item
+        self._field_meta, self._field_names = _itemFields(item)
+
+    def _field(self, name: str) -> NDArray:
+        """Returns the array of the given field creating it if necessary"""
+        arr = self._fields.get(name)
+        if arr is None:
+            arr = self._data[name][0]
             # use transpose to align the first index on both scalar and arrays
             # i.e. each array element is treated as its own field from the
-            # perspective of the memory
-            name: as_array(getattr(self._data, name)).T
-            for name, _ in item._fields_
-        }
-        # create set of field names (don't want to expose dict_keys)
-        self._field_names = set(self._fields.keys())
+            # perspective of the memory. Scalars are already aligned.
+            if hasattr(self._field_meta[name], "_length_"):
+                arr = arr.T
+            else:
+                # scalar fields are plain arrays -> copies are a single memcpy
+                assert arr.flags.c_contiguous
+            # strip padding
+            if len(arr) != self._capacity:
+                arr = arr[: self._capacity]
+            self._fields[name] = arr
+        return arr
 
     def __len__(self) -> int:
         return self._capacity
 
     def __contains__(self, key: str) -> bool:
-        return key in self._fields
+        return key in self._field_names
 
     def __getitem__(self, key: Any) -> Union[QueueSubView, NDArray]:
         if isinstance(key, (int, ndarray, slice)):
@@ -111,25 +178,39 @@ class QueueView:
             raise KeyError("Unsupported key type")
         if key not in self:
             raise KeyError(f"No field with name {key}")
-        return self._fields[key]
+        return self._field(key)
 
     def __setitem__(self, key: str, value: Any) -> None:
         if not isinstance(key, str):
             raise KeyError("Unsupported key type")
         if key not in self:
             raise KeyError(f"No field with name {key}")
-        self._fields[key][:] = value
+        self._field(key)[:] = value
 
     @property
     def capacity(self) -> int:
         """Capacity of the queue"""
         return self._capacity
 
+    @property
+    def align(self) -> int:
+        """Alignment in bytes of each field array"""
+        return self._align
+
     @property
     def fields(self) -> Set[str]:
         """Set of field names"""
         return self._field_names
 
+    def fieldCapacity(self, field: str) -> int:
+        """
+        Returns the number of elements the given field's array can hold
+        including padding. Equal to the capacity if there is no padding.
+        """
+        if field not in self:
+            raise KeyError(f"No field with name {field}")
+        return _fieldCapacity(self._field_meta[field], self.capacity, self.align)
+
     @property
     def header(self) -> Optional[Structure]:
         """Optional header. None if no header is present"""
@@ -160,6 +241,48 @@ class QueueView:
         """Structure describing the items of the queue"""
         return self._item
 
+    def rawBytes(self) -> memoryview:
+        """
+        Returns a memoryview over the memory holding the queue's items, i.e.
+        without header and counter.
+        """
+        return self._data.view(np.uint8).data
+
+    def writeRaw(self, file: BinaryIO) -> int:
+        """
+        Writes the raw memory of the queue's items into the given binary stream
+        in a single call. Returns the number of bytes written.
+        """
+        return file.write(self.rawBytes())
+
+    def readRaw(self, file: BinaryIO) -> int:
+        """
+        Reads the raw memory of the queue's items from the given binary stream
+        in a single call. Returns the number of bytes read.
+        """
+        return file.readinto(self.rawBytes())
+
+    def copyFrom(self, other: QueueView) -> None:
+        """
+        Copies the data and count of the given queue into this one. If both
+        queues share the same layout, the data is copied in a single memcpy,
+        otherwise field by field truncated to the smaller capacity.
+        Headers are not copied.
+        """
+        if other.item is not self.item:
+            raise ValueError("Both queues must have the same item type!")
+        if other.capacity == self.capacity and other.align == self.align:
+            # same memory layout -> copy everything at once
+            memmove(self._data.ctypes.data, other._data.ctypes.data, self._data.nbytes)
+            n = self.capacity
+        else:
+            n = min(self.capacity, other.capacity)
+            for name in self._field_names:
+                np.copyto(self._field(name)[:n], other._field(name)[:n])
+        # update counter
+        if self._counter is not None:
+            self._counter.value = min(other.count, n)
+
     def __repr__(self) -> str:
         return f"QueueView: {self.item.__name__}[{self.capacity}]"
 
@@ -167,23 +290,43 @@ class QueueView:
 class QueueSubView:
     """Utility class for slicing and masking a QueueView"""
 
+    __slots__ = ("_orig", "_mask", "_count", "_field_names")
+
     def __init__(
         self,
         orig: Union[QueueView, QueueSubView],
         mask: Union[int, slice, NDArray],
     ) -> None:
+        # convert boolean masks once into indices
+        if isinstance(mask, ndarray) and mask.dtype == bool:
+            if mask.shape != (len(orig),):
+                raise IndexError("Boolean mask does not match the view's length!")
+            mask = np.flatnonzero(mask)
+        # derive new length from mask without touching any data
+        if isinstance(mask, int):
+            self._count = 1
+        elif isinstance(mask, slice):
+            self._count = len(range(*mask.indices(len(orig))))
+        else:
+            self._count = mask.shape[0]
+        # collapse chains of index masks into a single gather on the original
+        if isinstance(orig, QueueSubView) and isinstance(orig._mask, ndarray):
+            mask = orig._mask[mask]
+            orig = orig._orig
         self._orig = orig
         self._mask = mask
-        # query new length by applying mask to a random field
-        self._count = (
-            1 if isinstance(mask, int) else len(orig[next(iter(orig.fields))][mask])
-        )
+        self._field_names = orig._field_names
 
     def __len__(self) -> int:
         return self._count
 
     def __contains__(self, key: str) -> bool:
-        return key in self._orig
+        return key in self._field_names
+
+    @property
+    def count(self) -> int:
+        """Number of items in the sub view"""
+        return self._count
 
     def __getitem__(self, key) -> Union[QueueView, NDArray]:
         if isinstance(key, (int, ndarray, slice)):
@@ -203,8 +346,8 @@ class QueueSubView:
 
     @property
     def fields(self) -> Set[str]:
-        """List of field names"""
-        return self._orig.fields
+        """Set of field names"""
+        return self._field_names
 
     @property
     def header(self) -> Optional[Structure]:
@@ -220,12 +363,114 @@ class QueueSubView:
         return f"QueueSubView: {self.item.__name__}[{self._count}]"
 
 
-def dumpQueue(queue: Union[QueueView, QueueSubView]) -> Dict[str, NDArray]:
+@lru_cache(maxsize=None)
+def _itemFields(item: Type[Structure]) -> Tuple[Dict[str, Any], FrozenSet[str]]:
+    """
+    Returns a dict mapping field names to their types and the set of field
+    names for the given item.
+    """
+    # use a frozenset as we don't want to expose dict_keys
+    meta = dict(item._fields_)
+    return meta, frozenset(meta)
+
+
+def _fieldCapacity(t: Type[Any], capacity: int, align: int) -> int:
+    """
+    Calculates the number of elements a field array of given type must hold so
+    that its size in bytes is a multiple of align.
+    """
+    # arrays are stored as one array per element
+    elemSize = sizeof(t._type_ if hasattr(t, "_length_") else t)
+    # smallest amount of elements whose size is a multiple of align
+    step = align // gcd(align, elemSize)
+    return -(-capacity // step) * step
+
+
+def _prefixSize(
+    header: Optional[Type[Structure]], skipCounter: bool, align: int
+) -> int:
+    """Size of the header and counter preceding the queue's data padded to align"""
+    size = 0 if header is None else sizeof(header)
+    if not skipCounter:
+        size += sizeof(QueueView.Counter)
+    return -(-size // align) * align
+
+
+def _soaOffsets(
+    item: Type[Structure], capacity: int, align: int
+) -> Tuple[Tuple[int, ...], int]:
+    """
+    Calculates the offset of each field array relative to the queue's data and
+    the total size of the data in bytes.
+    """
+    if align < 1:
+        raise ValueError("align must be positive!")
+    offsets = []
+    offset = 0
+    for _, t in item._fields_:
+        # respect natural alignment same as ctypes would
+        offset = -(-offset // alignment(t)) * alignment(t)
+        offsets.append(offset)
+        offset += sizeof(t) * _fieldCapacity(t, capacity, align)
+    return tuple(offsets), offset
+
+
+@lru_cache(maxsize=128)
+def _soaDtype(item: Type[Structure], capacity: int, align: int) -> np.dtype:
+    """
+    Creates a structured dtype describing the whole structure of arrays of a
+    queue as a single element, i.e. each field becomes a subarray at the offset
+    the corresponding array starts at. Results are cached, since queues of the
+    same type and capacity are usually created repeatedly. The cache is bounded
+    as capacities may vary a lot.
+    """
+    offsets, size = _soaOffsets(item, capacity, align)
+    names, formats = [], []
+    for name, t in item._fields_:
+        n = _fieldCapacity(t, capacity, align)
+        names.append(name)
+        if hasattr(t, "_length_"):
+            # arrays are stored element wise, i.e. as t._type_[t._length_][n]
+            formats.append((np.dtype(t._type_), (t._length_, n)))
+        else:
+            formats.append((np.dtype(t), (n,)))
+    return np.dtype(
+        {"names": names, "formats": formats, "offsets": offsets, "itemsize": size}
+    )
+
+
+@lru_cache(maxsize=None)
+def _dumpType(item: Type[Structure]) -> Type[NamedTuple]:
+    """Creates a named tuple type with a field for each field of the given item"""
+    # rename=True replaces invalid names, e.g. starting with an underscore
+    fields = [name for name, _ in item._fields_]
+    return namedtuple(f"{item.__name__}Queue", fields, rename=True)
+
+
+def dumpQueue(
+    queue: Union[QueueView, QueueSubView], *, asTuple: bool = False
+) -> Union[Dict[str, NDArray], NamedTuple]:
     """
     Creates a dictionary containing an entry for each field of the queue mapped
     to a copy of the corresponding data.
+
+    If asTuple is True, returns instead a named tuple with the fields in the
+    same order as in the queue's item, allowing cheaper attribute access.
+    The type of the tuple is shared by all queues of the same item. Field names
+    that are not valid for named tuples, e.g. starting with an underscore, are
+    replaced by their position prefixed with an underscore.
+
+    Copies of array fields keep the element major memory layout of the queue,
+    i.e. are Fortran ordered.
     """
-    return {field: queue[field][: queue.count].copy() for field in queue.fields}
+    # order="K" keeps the memory layout of the queue, i.e. array fields stay
+    # element major and get copied as contiguous blocks instead of transposed
+    count = queue.count
+    if asTuple:
+        return _dumpType(queue.item)(
+            *(queue[field][:count].copy("K") for field, _ in queue.item._fields_)
+        )
+    return {field: queue[field][:count].copy("K") for field in queue.fields}
 
 
 def updateQueue(
@@ -253,24 +498,64 @@ def updateQueue(
     counter will be updated to the smallest length capped to the queue's
     capacity.
     """
-    counts = []
+    first = minCount = None
+    mismatch = False
+    truncated = []
+    capacity = queue.capacity
     for field, arr in data.items():
         # safety check
         if field not in queue.fields:
             warnings.warn(f'Skipping unknown field "{field}"')
             continue  # skip unknown field
-        if len(arr) > queue.capacity:
-            warnings.warn(f'Field "{field}" truncated to queue\'s capacity')
         # store data
-        n = min(queue.capacity, len(arr))
+        n = len(arr)
+        if n > capacity:
+            truncated.append(field)
+            n = capacity
         queue[field][:n] = arr[:n]
-        counts.append(n)
+        # track count
+        if first is None:
+            first = minCount = n
+        elif n != first:
+            mismatch = True
+            minCount = min(minCount, n)
+    # issue a single warning for all truncated fields
+    if truncated:
+        warnings.warn(f"Fields truncated to queue's capacity: {truncated}")
     # check all fields had the same size
-    if len(counts) > 0 and not all(c == counts[0] for c in counts):
+    if mismatch:
         warnings.warn("Not all fields have the same length!")
     # update counter if necessary
-    if queue.hasCounter and updateCount:
-        queue.count = min(counts)
+    if queue.hasCounter and updateCount and minCount is not None:
+        queue.count = minCount
+
+
+def updateQueueFromAoS(
+    queue: Union[QueueView, QueueSubView, QueueBuffer],
+    data: NDArray,
+    *,
+    updateCount: bool = True,
+) -> None:
+    """
+    Updates the given queue using the items stored as array of structures, i.e.
+    a structured numpy array with the fields of the queue's item. The transpose
+    into the queue's structure of arrays happens on the CPU. Consider using
+    `scatterQueue` for tensors instead.
+
+    Parameters
+    ----------
+    queue: QueueView | QueueSubView | QueueBuffer
+        queue to update
+    data: NDArray
+        structured array of items, e.g. `ArrayBuffer.numpy()`
+    updateCount: bool = True
+        Whether to update the queue's count. Ignored if queue has no counter.
+    """
+    if isinstance(queue, QueueBuffer):
+        queue = queue.view
+    # structured fields are strided views -> no intermediate copy
+    fields = {name: data[name] for name in data.dtype.names}
+    updateQueue(queue, fields, updateCount=updateCount)
 
 
 def queueSize(
@@ -279,6 +564,7 @@ def queueSize(
     *,
     header: Optional[Type[Structure]] = None,
     skipCounter: bool = False,
+    align: int = 1,
 ) -> int:
     """
     Calculates the required size to store a queue of given size and item type
@@ -293,15 +579,19 @@ def queueSize(
         Optional header prefixing the queue
     skipCounter: bool, default=False
         True, if the queue should not contain a counter
+    align: int, default=1
+        Alignment in bytes each field array as well as the header and counter
+        are padded to. Requires item to be a Structure if greater than one.
     """
-    itemSize = item if isinstance(item, int) else sizeof(item)
-    size = itemSize * capacity
-    if header is not None:
-        size += sizeof(header)
-    if not skipCounter:
-        size += sizeof(QueueView.Counter)
+    if align == 1:
+        itemSize = item if isinstance(item, int) else sizeof(item)
+        size = itemSize * capacity
+    elif isinstance(item, int):
+        raise ValueError("Padded queues require the item's structure!")
+    else:
+        size = _soaOffsets(item, capacity, align)[1]
 
-    return size
+    return size + _prefixSize(header, skipCounter, align)
 
 
 def as_queue(
@@ -312,6 +602,7 @@ def as_queue(
     size: Optional[int] = None,
     header: Optional[Type[Structure]] = None,
     skipCounter: bool = False,
+    align: int = 1,
 ) -> QueueView:
     """
     Helper function returning a QueueView pointing at the given buffer.
@@ -331,6 +622,8 @@ def as_queue(
         Optional header prefixing the queue
     skipCounter: bool, default=False
         True, if data does not contain a counter
+    align: int, default=1
+        Alignment in bytes each field array is padded to
 
     Returns
     -------
@@ -339,18 +632,44 @@ def as_queue(
     """
     if size is None:
         size = buffer.size_bytes - offset
+    return _queueView(buffer.address + offset, item, size, header, skipCounter, align)
+
+
+@lru_cache(maxsize=64)
+def _queueView(
+    address: int,
+    item: Type[Structure],
+    size: int,
+    header: Optional[Type[Structure]],
+    skipCounter: bool,
+    align: int,
+) -> QueueView:
+    """
+    Creates the QueueView for the given memory region. Views only depend on
+    the address and layout, so they are cached to skip the capacity search and
+    view creation for buffers being viewed repeatedly, e.g. once per frame.
+    """
     # calculate capacity
-    if header is not None:
-        size -= sizeof(header)
-    if not skipCounter:
-        size -= sizeof(QueueView.Counter)
-    item_size = sizeof(item)
-    if size < 0 or size % item_size:
+    size -= _prefixSize(header, skipCounter, align)
+    if align == 1:
+        capacity = max(size, 0) // sizeof(item)
+    else:
+        # padding only adds memory -> search downwards starting at the capacity
+        # the fields would have without any padding
+        packed = sum(sizeof(t) for _, t in item._fields_)
+        capacity = max(size, 0) // packed
+        while capacity > 0 and _soaOffsets(item, capacity, align)[1] > size:
+            capacity -= 1
+    if size < 0 or queueSize(item, capacity, skipCounter=True, align=align) != size:
         raise ValueError("The size of the buffer does not match any queue size!")
-    capacity = size // item_size
     # create view
     return QueueView(
-        buffer.address + offset, item, capacity, skipCounter=skipCounter, header=header
+        address,
+        item,
+        capacity,
+        skipCounter=skipCounter,
+        header=header,
+        align=align,
     )
 
 
@@ -368,6 +687,8 @@ class QueueBuffer(RawBuffer):
         Optional header prefixing the queue
     skipCounter: bool, default=False
         True, if data does not contain a counter
+    align: int, default=1
+        Alignment in bytes each field array is padded to
     """
 
     def __init__(
@@ -377,12 +698,20 @@ class QueueBuffer(RawBuffer):
         *,
         header: Optional[Type[Structure]] = None,
         skipCounter: bool = False,
+        align: int = 1,
     ) -> None:
         super().__init__(
-            queueSize(item, capacity, header=header, skipCounter=skipCounter)
+            queueSize(
+                item, capacity, header=header, skipCounter=skipCounter, align=align
+            )
         )
         self._view = QueueView(
-            self.address, item, capacity, header=header, skipCounter=skipCounter
+            self.address,
+            item,
+            capacity,
+            header=header,
+            skipCounter=skipCounter,
+            align=align,
         )
 
     @property
@@ -424,6 +753,8 @@ class QueueTensor(ByteTensor):
         Optional header prefixing the queue
     skipCounter: bool, default=False
         True, if data does not contain a counter
+    align: int, default=1
+        Alignment in bytes each field array is padded to
     """
 
     def __init__(
@@ -433,14 +764,19 @@ class QueueTensor(ByteTensor):
         *,
         header: Optional[Type[Structure]] = None,
         skipCounter: bool = False,
+        align: int = 1,
     ) -> None:
         super().__init__(
-            queueSize(item, capacity, header=header, skipCounter=skipCounter)
+            queueSize(
+                item, capacity, header=header, skipCounter=skipCounter, align=align
+            )
         )
         self._item = item
         self._capacity = capacity
         self._header = header
         self._hasCounter = not skipCounter
+        self._align = align
+        self._layout = None
 
     @property
     def header(self) -> Optional[Structure]:
@@ -457,6 +793,11 @@ class QueueTensor(ByteTensor):
         """Capacity of the queue"""
         return self._capacity
 
+    @property
+    def align(self) -> int:
+        """Alignment in bytes of each field array"""
+        return self._align
+
     @property
     def item(self) -> Type[Structure]:
         """Structure describing the items of the queue"""
@@ -486,15 +827,151 @@ def clearQueue(
     return clearTensor(queue, size=sizeof(QueueView.Counter), offset=offset)
 
 
+_SCATTER_CODE = """\
+#version 460
+
+layout(local_size_x = 32) in;
+
+layout(std430, binding = 0) readonly buffer AoS {{
+    uint aos[];
+}};
+layout(std430, binding = 1) buffer Queue {{
+    uint soa[];
+}};
+// word offset of the counter followed by the word offset of each column
+layout(std430, binding = 2) readonly buffer Layout {{
+    uint counter;
+    uint columns[];
+}};
+
+layout(push_constant) uniform Push {{
+    uint count;
+}};
+
+void main() {{
+    uint i = gl_GlobalInvocationID.x;
+    if (i == 0 && counter != 0xFFFFFFFFu)
+        soa[counter] = count;
+    if (i >= count)
+        return;
+    uint src = i * {itemWords}u;
+{copies}
+}}
+"""
+
+
+@lru_cache(maxsize=1)
+def _compiler() -> Compiler:
+    """Returns the compiler shared by all generated programs"""
+    return Compiler()
+
+
+@lru_cache(maxsize=32)
+def _compile(code: str) -> bytes:
+    """Compiles the given GLSL code into SPIR-V. Results are cached per code."""
+    return _compiler().compile(code)
+
+
+def _scatterColumns(
+    item: Type[Structure],
+) -> Iterator[Tuple[str, Type[Any], int, int, int]]:
+    """
+    Yields name, type, element index, source word offset and word count of each
+    column, i.e. each field or array element, of the given item.
+    """
+    if sizeof(item) % 4:
+        raise ValueError("Item size must be a multiple of 4 bytes!")
+    for name, t in item._fields_:
+        src = getattr(item, name).offset
+        # arrays are stored element wise -> treat each element as own column
+        length = t._length_ if hasattr(t, "_length_") else 1
+        elemSize = sizeof(t) // length
+        if src % 4 or elemSize % 4:
+            raise ValueError(f'Field "{name}" is not aligned to 4 bytes!')
+        for j in range(length):
+            yield name, t, j, (src + j * elemSize) // 4, elemSize // 4
+
+
+@lru_cache(maxsize=None)
+def _scatterProgram(item: Type[Structure]) -> Program:
+    """
+    Creates a program that copies items stored as array of structures into a
+    queue of the given item. The queue's layout is passed as an additional
+    tensor, thus a single program serves all queues of the same item. Programs
+    are never evicted as dispatch commands only reference them.
+    """
+    # generate code copying each column word by word
+    copies = []
+    for c, (_, _, _, s0, words) in enumerate(_scatterColumns(item)):
+        copies.extend(
+            f"    soa[columns[{c}u] + i * {words}u + {k}u] = aos[src + {s0 + k}u];"
+            for k in range(words)
+        )
+    code = _SCATTER_CODE.format(itemWords=sizeof(item) // 4, copies="\n".join(copies))
+    return Program(_compile(code))
+
+
+def _scatterLayout(queue: QueueTensor) -> UnsignedIntTensor:
+    """
+    Returns the tensor holding the word offsets of the counter and each column
+    of the given queue as expected by the scatter program. Created on first use
+    and stored on the queue.
+    """
+    if queue._layout is not None:
+        return queue._layout
+    header, skipCounter = queue.header, not queue.hasCounter
+    if header is not None and sizeof(header) % 4:
+        raise ValueError("Header size must be a multiple of 4 bytes!")
+    prefix = _prefixSize(header, skipCounter, queue.align)
+    if prefix % 4:
+        raise ValueError("align must be a multiple of 4 bytes!")
+    layout = [0xFFFFFFFF if skipCounter else 0]
+    if not skipCounter and header is not None:
+        layout[0] = sizeof(header) // 4
+    item, capacity, align = queue.item, queue.capacity, queue.align
+    dtype = _soaDtype(item, capacity, align)
+    for name, t, j, _, words in _scatterColumns(item):
+        n = _fieldCapacity(t, capacity, align)
+        layout.append((prefix + dtype.fields[name][1]) // 4 + j * n * words)
+    queue._layout = UnsignedIntTensor(np.array(layout, dtype=np.uint32))
+    return queue._layout
+
+
+def scatterQueue(src: Tensor, dst: QueueTensor, count: int) -> Command:
+    """
+    Returns a command transposing items stored as array of structures in the
+    given tensor into the structure of arrays of the queue on the GPU. Updates
+    the queue's count if it has one. Compiled programs are cached per item
+    type. Requires items, fields and header to be aligned to 4 bytes.
+
+    Parameters
+    ----------
+    src: Tensor
+        Tensor containing the items as array of structures, e.g. `ArrayTensor`
+    dst: QueueTensor
+        Queue the items are copied into
+    count: int
+        Number of items to copy
+    """
+    if count > dst.capacity:
+        raise ValueError("count exceeds the queue's capacity!")
+    program = _scatterProgram(dst.item)
+    program.bindParams(src, dst, _scatterLayout(dst))
+    groups = max(1, -(-count // 32))
+    return program.dispatchPush(bytes(c_uint32(count)), groups)
+
+
 def saveQueue(
     file: Union[str, bytes, PathLike, BinaryIO],
     queue: Union[QueueView, QueueSubView, QueueBuffer],
     *,
-    compressed: bool = True,
+    compressed: bool = False,
     skipHeader: bool = False,
+    raw: bool = False,
 ) -> None:
     """
     Saves the given queue under the given path or into the given stream.
+    Only the first `count` items are saved.
 
     Parameters
     ----------
@@ -503,12 +980,19 @@ def saveQueue(
         is written into or a binary stream the result is written into.
     queue: QueueView | QueueSubView | QueueBuffer
         Buffer to save
-    compressed: bool = True
-        Whether to compress the data.
+    compressed: bool = False
+        Whether to compress the data. Queues usually hold floating point data,
+        which compresses poorly while making saving CPU bound.
     skipHeader: bool = False
         Whether to skip the header during serialization.
         Ignored if there is no header.
+    raw: bool = False
+        Whether to use the flat format of `saveQueueRaw` instead of a numpy
+        archive. Ignores compressed.
     """
+    if raw:
+        saveQueueRaw(file, queue, skipHeader=skipHeader)
+        return
     if isinstance(queue, QueueBuffer):
         queue = queue.view
     # save guard for open files
@@ -523,7 +1007,8 @@ def saveQueue(
             file.write(bytes(queue.header))
 
         # collect field and save them
-        data = {field: queue[field] for field in queue.fields}
+        count = queue.count
+        data = {field: queue[field][:count] for field in queue.fields}
         if compressed:
             np.savez_compressed(file, **data)
         else:
@@ -536,6 +1021,7 @@ def loadQueue(
     *,
     skipHeader: bool = False,
     updateCount: bool = True,
+    raw: bool = False,
 ) -> None:
     """
     Updates the given queue with the data from the given file or path.
@@ -547,11 +1033,17 @@ def loadQueue(
         itself containing the data to be loaded.
     queue: QueueView | QueueSubview | QueueBuffer
         Queue the data will be loaded into
-    compressed: bool = True
-        Whether to compress the data.
+    skipHeader: bool = False
+        Whether the header was skipped during serialization.
+        Ignored if there is no header.
     updateCount: bool = True
         Whether to update the queue's count. Ignored if queue has no counter.
+    raw: bool = False
+        Whether the queue was saved using the flat format of `saveQueueRaw`.
     """
+    if raw:
+        loadQueueRaw(file, queue, skipHeader=skipHeader, updateCount=updateCount)
+        return
     if isinstance(queue, QueueBuffer):
         queue = queue.view
     # save guard for open files
@@ -563,9 +1055,182 @@ def loadQueue(
 
         # read header if necessary
         if queue.header is not None and not skipHeader:
-            data = file.read(sizeof(queue.header))
-            # looks quirky, but essentially just a copying new data into header
-            pointer(queue.header)[0] = type(queue.header).from_buffer_copy(data)
+            size = sizeof(queue.header)
+            data = file.read(size)
+            if len(data) != size:
+                raise ValueError("Unexpected end of file while reading header!")
+            memmove(addressof(queue.header), data, size)
 
         # load all fields
-        updateQueue(queue, np.load(file), updateCount=updateCount)
+        # the archive loads each field only when accessed
+        with np.load(file, allow_pickle=False) as data:
+            updateQueue(queue, data, updateCount=updateCount)
+
+
+_RAW_MAGIC = b"HPQUEUE\x00"
+"""Magic bytes identifying queues saved by saveQueueRaw"""
+
+
+def _flatten(arr: NDArray) -> Tuple[NDArray, str]:
+    """
+    Returns the bytes of the array in memory order without copying if possible
+    as well as the corresponding order used to restore its shape.
+    """
+    if not (arr.flags.c_contiguous or arr.flags.f_contiguous):
+        # truncated array fields are strided -> gather them element-major
+        arr = arr.copy("K")
+    order = "C" if arr.flags.c_contiguous else "F"
+    return np.ravel(arr, order="K").view(np.uint8), order
+
+
+def _mapFile(file: BinaryIO, size: int) -> Any:
+    """
+    Memory maps the next size bytes of the given file and advances the stream
+    accordingly. Falls back to reading them if the stream cannot be mapped.
+    """
+    try:
+        fileno = file.fileno()
+        pos = file.tell()
+        mapped = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, UnsupportedOperation, ValueError):
+        return file.read(size)
+    file.seek(pos + size)
+    return memoryview(mapped)[pos : pos + size]
+
+
+def saveQueueRaw(
+    file: Union[str, bytes, PathLike, BinaryIO],
+    queue: Union[QueueView, QueueSubView, QueueBuffer],
+    *,
+    skipHeader: bool = False,
+) -> None:
+    """
+    Saves the first `count` items of the given queue in a flat format: A small
+    JSON header describing each field followed by the raw bytes of the queue's
+    header and fields. Unlike `saveQueue` this skips building a zip archive
+    including its checksums and thus is considerably faster for large queues.
+
+    Parameters
+    ----------
+    file: str | bytes | PathLike | BinaryIO
+        Either a path-like object specifying the path to the file the result
+        is written into or a binary stream the result is written into.
+    queue: QueueView | QueueSubView | QueueBuffer
+        Buffer to save
+    skipHeader: bool = False
+        Whether to skip the header during serialization.
+        Ignored if there is no header.
+    """
+    if isinstance(queue, QueueBuffer):
+        queue = queue.view
+    count = queue.count
+    header = None
+    if queue.header is not None and not skipHeader:
+        header = bytes(queue.header)
+
+    # describe fields and their position in the data section
+    offset = len(header) if header is not None else 0
+    fields, chunks = {}, []
+    for name in queue.fields:
+        # sub views create a new array on each access -> fetch field only once
+        arr = queue[name]
+        data, order = _flatten(arr[:count])
+        fields[name] = {
+            "dtype": dtype_to_descr(arr.dtype),
+            "shape": list(arr.shape[1:]),
+            "order": order,
+            "offset": offset,
+        }
+        chunks.append(data)
+        offset += data.nbytes
+    meta = json.dumps(
+        {
+            "count": count,
+            "header": len(header) if header is not None else None,
+            "fields": fields,
+            "size": offset,
+        }
+    ).encode()
+
+    # save guard for open files
+    with ExitStack() as stack:
+        # checking for IO is a bit weird so we check for path like and just
+        # treat it like a file otherwise
+        if isinstance(file, (str, bytes, PathLike)):
+            file = stack.enter_context(open(file, "wb"))
+
+        file.write(_RAW_MAGIC)
+        file.write(bytes(c_uint32(len(meta))))
+        file.write(meta)
+        if header is not None:
+            file.write(header)
+        for data in chunks:
+            file.write(data)
+
+
+def loadQueueRaw(
+    file: Union[str, bytes, PathLike, BinaryIO],
+    queue: Union[QueueView, QueueSubView, QueueBuffer],
+    *,
+    skipHeader: bool = False,
+    updateCount: bool = True,
+) -> None:
+    """
+    Updates the given queue with the data from the given file or path saved
+    by `saveQueueRaw`. If possible, the file is memory mapped and copied from
+    directly into the queue.
+
+    Parameters
+    ----------
+    file: str | bytes | PathLike | BinaryIO
+        Either a path-like object specifying the path to the file or the file
+        itself containing the data to be loaded.
+    queue: QueueView | QueueSubview | QueueBuffer
+        Queue the data will be loaded into
+    skipHeader: bool = False
+        Whether to ignore the saved header.
+        Ignored if there is no header.
+    updateCount: bool = True
+        Whether to update the queue's count. Ignored if queue has no counter.
+    """
+    if isinstance(queue, QueueBuffer):
+        queue = queue.view
+    # save guard for open files
+    with ExitStack() as stack:
+        # checking for IO is a bit weird so we check for path like and just
+        # treat it like a file otherwise
+        if isinstance(file, (str, bytes, PathLike)):
+            file = stack.enter_context(open(file, "rb"))
+
+        prefix = file.read(len(_RAW_MAGIC) + sizeof(c_uint32))
+        if len(prefix) != len(_RAW_MAGIC) + sizeof(c_uint32):
+            raise ValueError("Unexpected end of file while reading queue!")
+        if prefix[: len(_RAW_MAGIC)] != _RAW_MAGIC:
+            raise ValueError("File does not contain a raw queue!")
+        size = c_uint32.from_buffer_copy(prefix[len(_RAW_MAGIC) :]).value
+        meta = json.loads(file.read(size))
+        buffer = _mapFile(file, meta["size"])
+        if len(buffer) != meta["size"]:
+            raise ValueError("Unexpected end of file while reading queue!")
+
+        # read header if necessary
+        header = queue.header
+        if meta["header"] is not None and header is not None and not skipHeader:
+            size = sizeof(header)
+            if size != meta["header"]:
+                raise ValueError("Saved header does not match the queue's one!")
+            memmove(addressof(header), bytes(buffer[:size]), size)
+
+        # view fields without copying
+        count = meta["count"]
+        data = {}
+        for name, field in meta["fields"].items():
+            shape = (count, *field["shape"])
+            arr = np.frombuffer(
+                buffer,
+                descr_to_dtype(field["dtype"]),
+                int(np.prod(shape)),
+                field["offset"],
+            )
+            data[name] = arr.reshape(shape, order=field["order"])
+        updateQueue(queue, data, updateCount=updateCount)
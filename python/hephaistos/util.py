@@ -1,9 +1,16 @@
 import ctypes
-from typing import Any, Union
+import numpy as np
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Optional, Tuple, Union
 from numpy.ctypeslib import as_array
 from .pyhephaistos import ByteTensor, RawBuffer
 
 
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB", "PB")
+_SIZE_SCALES = tuple(1.0 / (1 << (dim * 10)) for dim in range(len(_SIZE_UNITS)))
+
+
 def printSize(size_bytes: int) -> str:
     """
     Creates a printable representation of the given size in bytes by using a
@@ -11,16 +18,18 @@ def printSize(size_bytes: int) -> str:
     """
     if size_bytes == 0:
         return "0B"
-    names = ["B", "KB", "MB", "GB", "TB", "PB"]
     dim = (size_bytes.bit_length() - 1) // 10
-    dim = min(dim, len(names) - 1)
-    unit = 2 << (dim * 10) - 1
-    return f"{size_bytes/unit:.1f} {names[dim]}"
+    dim = min(dim, len(_SIZE_UNITS) - 1)
+    return f"{size_bytes * _SIZE_SCALES[dim]:.1f} {_SIZE_UNITS[dim]}"
 
 
-def collectFields(struct: ctypes.Structure) -> list[tuple[str, ctypes._SimpleCData]]:
+@lru_cache(maxsize=None)
+def collectFields(
+    struct: ctypes.Structure,
+) -> Tuple[Tuple[str, ctypes._SimpleCData], ...]:
     """
-    Returns a flat list of fields and their types for a given ctype structure.
+    Returns a flat tuple of fields and their types for a given ctype structure.
+    Results are cached per structure.
     """
     fields = []
     for name, T in struct._fields_:
@@ -42,13 +51,15 @@ def collectFields(struct: ctypes.Structure) -> list[tuple[str, ctypes._SimpleCDa
                 fields.extend([(f"{name}[{i}]", T._type_) for i in range(T._length_)])
         else:
             fields.append((name, T))
-    return fields
+    return tuple(fields)
 
 
+@lru_cache(maxsize=None)
 def createFlatType(struct: ctypes.Structure) -> ctypes.Structure:
     """
     Creates a equivalent ctype structure from the given one where all nested
-    types are flattened.
+    types are flattened. The created type is cached, i.e. the same structure
+    always results in the identical flat type.
     """
     fields = collectFields(struct)
 
@@ -58,11 +69,25 @@ def createFlatType(struct: ctypes.Structure) -> ctypes.Structure:
     return Flat
 
 
+@lru_cache(maxsize=None)
+def _numpyDtype(type: ctypes.Structure) -> Optional[np.dtype]:
+    """
+    Returns the numpy dtype equivalent to the given ctype or None if numpy
+    cannot represent it, e.g. due to bit fields.
+    """
+    try:
+        return np.dtype(type)
+    except (TypeError, ValueError, NotImplementedError):
+        return None
+
+
 class ArrayBuffer(RawBuffer):
     """
     Helper class for creating buffer holding an array of a given type.
     """
 
+    __slots__ = ("_arr", "_flat", "_np")
+
     def __init__(self, type: ctypes.Structure, size: int):
         """
         Creates a typed array buffer of the given type and size.
@@ -70,6 +95,7 @@ class ArrayBuffer(RawBuffer):
         super().__init__(ctypes.sizeof(type) * size)
         self._arr = (type * size).from_address(super().address)
         self._flat = (createFlatType(type) * size).from_address(super().address)
+        self._np = self._numpy(self._arr)
 
     @property
     def array(self):
@@ -85,7 +111,18 @@ class ArrayBuffer(RawBuffer):
         If flat is True, the field names correspond the the flattened ones, i.e.
         ["dir.x"] instead of ["dir"]["x"].
         """
-        return as_array(self.flatarray if flat else self.array)
+        arr = self._flat if flat else self._arr
+        view = self._numpy(arr) if flat else self._np
+        return view if view is not None else as_array(arr)
+
+    def _numpy(self, arr: ctypes.Array) -> Optional[np.ndarray]:
+        """Creates a numpy view of the given array or None if not possible"""
+        dtype = _numpyDtype(arr._type_)
+        if dtype is None:
+            return None
+        # skip the buffer protocol roundtrip of as_array
+        raw = (ctypes.c_ubyte * ctypes.sizeof(arr)).from_address(self.address)
+        return np.frombuffer(raw, dtype, len(arr))
 
     def __len__(self):
         return self._arr.__len__()
@@ -94,7 +131,39 @@ class ArrayBuffer(RawBuffer):
         return self._arr.__getitem__(key)
 
     def __setitem__(self, key, item):
-        return self._arr.__setitem__(key, item)
+        # bulk copy arrays of matching type instead of converting them element wise
+        if (
+            isinstance(item, np.ndarray)
+            and self._np is not None
+            and item.dtype == self._np.dtype
+        ):
+            self._np[key] = item
+        elif isinstance(key, slice) and isinstance(
+            item, (bytes, bytearray, memoryview, ArrayBuffer)
+        ):
+            self._copyBytes(key, item)
+        else:
+            self._arr.__setitem__(key, item)
+
+    def _copyBytes(self, key: slice, item: Any) -> None:
+        """Copies the raw bytes of item into the given slice via memmove"""
+        start, stop, step = key.indices(len(self._arr))
+        if step != 1:
+            raise ValueError("Raw bytes can only be copied into contiguous slices!")
+        itemSize = ctypes.sizeof(self._arr._type_)
+        size = max(stop - start, 0) * itemSize
+        if isinstance(item, ArrayBuffer):
+            src, nbytes = item.address, item.size_bytes
+        else:
+            # access the buffer without copying it even if it is read only
+            data = np.frombuffer(item, np.uint8)
+            src, nbytes = data.ctypes.data, data.nbytes
+        if nbytes != size:
+            raise ValueError("Size of the data does not match the size of the slice!")
+        ctypes.memmove(self.address + start * itemSize, src, size)
+
+    def __bytes__(self) -> bytes:
+        return ctypes.string_at(self.address, ctypes.sizeof(self._arr))
 
     def __iter__(self):
         return iter(self._arr)
@@ -106,6 +175,8 @@ class ArrayTensor(ByteTensor):
     and size.
     """
 
+    __slots__ = ()
+
     def __init__(self, type: ctypes.Structure, size: int, mapped: bool = False):
         """
         Create a typed array tensor of given type and size.
@@ -113,31 +184,62 @@ class ArrayTensor(ByteTensor):
         super().__init__(ctypes.sizeof(type) * size, mapped)
 
 
+def _structureField(name: str, field: Any) -> property:
+    """Creates a property forwarding a field of a StructureBuffer's structure"""
+
+    def setter(obj: Any, value: Any) -> None:
+        field.__set__(obj._struct, value)
+
+    # attrgetter resolves the getter in C without a Python frame
+    return property(attrgetter(f"_struct.{name}"), setter)
+
+
+@lru_cache(maxsize=None)
+def _structureBufferType(cls: type, struct: ctypes.Structure) -> type:
+    """
+    Creates a subclass of the given StructureBuffer class exposing the fields
+    of the given structure as properties. The created type is cached per
+    class and structure.
+    """
+    fields = {
+        # skip fields shadowing attributes of the buffer
+        name: _structureField(name, getattr(struct, name))
+        for name, *_ in struct._fields_
+        if not hasattr(cls, name)
+    }
+    fields["_structType_"] = struct
+    fields["__slots__"] = ()
+    return type(f"{cls.__name__}[{struct.__name__}]", (cls,), fields)
+
+
 class StructureBuffer(RawBuffer):
     """
     Helper class for creating typed buffers.
+    Fields are accessible either directly on the buffer or via the structure
+    returned by `struct`. Fields whose name clashes with an attribute of the
+    buffer, e.g. size, are only accessible via the latter.
     """
 
+    __slots__ = ("_struct",)
+
     def __init__(self, type: ctypes.Structure):
         """
         Creates a typed buffer with the given type.
         """
         super().__init__(ctypes.sizeof(type))
-        # bypass __setattr__ we are overriding
-        super().__setattr__(
-            "_pointer", ctypes.cast(super().address, ctypes.POINTER(type))
-        )
+        # create the structure once instead of dereferencing a pointer on each
+        # access
+        self._struct = type.from_address(self.address)
+        # specialize the class once per structure type to expose its fields
+        # done here instead of __new__ so subclasses may have any signature
+        cls = self.__class__
+        if getattr(cls, "_structType_", None) is not type:
+            self.__class__ = _structureBufferType(cls, type)
 
-    def __getattribute__(self, __name: str):
-        # special types: size, size_bytes
-        if __name in ["size", "size_bytes"]:
-            return super().__getattribute__(__name)
-        # bypass __getattribute__ to prevent infinite loop
-        return super().__getattribute__("_pointer").contents.__getattribute__(__name)
-
-    def __setattr__(self, __name: str, __value: Any) -> None:
-        # bypass our own __getattribute__
-        super().__getattribute__("_pointer").contents.__setattr__(__name, __value)
+    @property
+    def struct(self) -> ctypes.Structure:
+        """Structure sharing the memory of the buffer"""
+        return self._struct
 
 
 class StructureTensor(ByteTensor):
@@ -145,6 +247,8 @@ class StructureTensor(ByteTensor):
     Helper class for creating tensors matching the size of a given struct.
     """
 
+    __slots__ = ()
+
     def __init__(self, typeOrData: Union[ctypes.Structure, Any], mapped: bool = False):
         """
         Creates a tensor with the exact size to hold the given structure.
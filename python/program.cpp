@@ -1,4 +1,5 @@
 #include <nanobind/nanobind.h>
+#include <nanobind/ndarray.h>
 #include <nanobind/stl/optional.h>
 #include <nanobind/stl/string.h>
 #include <nanobind/stl/string_view.h>
@@ -17,6 +18,9 @@ using namespace nb::literals;
 
 namespace {
 
+// const data type also accepts read only arrays, e.g. from bytes or mmap
+using CodeArray = nb::ndarray<const uint32_t, nb::shape<nb::any>, nb::c_contig, nb::device::cpu>;
+
 hp::SubgroupProperties getSubgroupProperties(uint32_t i) {
     auto& devices = getDevices();
     if (i >= devices.size())
@@ -180,6 +184,19 @@ void registerProgramModule(nb::module_& m) {
             "\n\nParameters\n----------\n"
             "code: bytes\n"
             "    Byte code of the program\n")
+        .def("__init__",
+            [](hp::Program* p, const CodeArray& code) {
+                nb::gil_scoped_release release;
+                new (p) hp::Program(getCurrentContext(),
+                    std::span<const uint32_t>{ code.data(), code.size() });
+            }, "code"_a.noconvert(),
+            "Creates a new program using the shader's byte code stored in a "
+            "contiguous uint32 array without copying it first. Other data types "
+            "are rejected. Wrap raw bytes or memory mapped files using "
+            "np.frombuffer(code, np.uint32)."
+            "\n\nParameters\n----------\n"
+            "code: NDArray[uint32]\n"
+            "    Byte code of the program\n")
         .def("__init__",
             [](hp::Program* p, nb::bytes code, nb::bytes spec) {
                 nb::gil_scoped_release release;
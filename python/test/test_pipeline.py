@@ -1,11 +1,22 @@
 import hephaistos as hp
 import hephaistos.pipeline as pl
+import mmap
 import numpy as np
+import pytest
 
 from ctypes import Structure, c_int32
 from os.path import dirname, join
 
-from typing import List
+from typing import List, Optional, Union
+
+
+@pytest.fixture(scope="module")
+def pipeline_spv() -> np.ndarray:
+    # map shader once and share it across tests without copying it
+    shader_path = join(dirname(__file__), "shader/pipeline_test.spv")
+    with open(shader_path, "rb") as f:
+        code = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return np.frombuffer(code, np.uint32)
 
 
 def test_runPipelineStage():
@@ -23,9 +34,11 @@ def test_runPipelineStage():
 
     # check result
     expected = np.zeros(64) + 42
-    assert np.all(retriever.view(0, np.int32) == expected)
+    np.testing.assert_array_equal(retriever.view(0, np.int32), expected)
     expected[:32] = 23
-    assert np.all(retriever.view(1, np.int32) == expected)
+    np.testing.assert_array_equal(retriever.view(1, np.int32), expected)
+    # views are reused
+    assert retriever.view(1, np.int32) is retriever.view(1, np.int32)
 
 
 def test_runPipeline():
@@ -48,8 +61,8 @@ def test_runPipeline():
     pl.runPipeline([updater, retriever], 1)
 
     # check result
-    assert np.all(retriever.view(0, np.int32) == b1)
-    assert np.all(retriever.view(1, np.int32) == b2)
+    np.testing.assert_array_equal(retriever.view(0, np.int32), b1)
+    np.testing.assert_array_equal(retriever.view(1, np.int32), b2)
 
 
 class PipelineTestStage(pl.PipelineStage):
@@ -58,14 +71,15 @@ class PipelineTestStage(pl.PipelineStage):
 
     name = "test"
 
-    def __init__(self) -> None:
+    def __init__(self, code: Optional[Union[bytes, np.ndarray]] = None) -> None:
         super().__init__({"Params": self.Params})
-        # load shader
-        code = None
-        shader_path = join(dirname(__file__), "shader/pipeline_test.spv")
-        with open(shader_path, "rb") as f:
-            code = f.read()
+        # load shader if not provided
+        if code is None:
+            shader_path = join(dirname(__file__), "shader/pipeline_test.spv")
+            with open(shader_path, "rb") as f:
+                code = f.read()
         # create program
+        # each stage binds its own tensor, so programs cannot be shared
         self._program = hp.Program(code)
         # create tensor
         self.tensor = hp.IntTensor(256)
@@ -76,9 +90,24 @@ class PipelineTestStage(pl.PipelineStage):
         return [self._program.dispatch(256 // 32)]
 
 
-def test_pipeline():
+@pytest.fixture(scope="module")
+def pipeline_stage(pipeline_spv) -> PipelineTestStage:
+    # creating the program is expensive -> share the stage across tests
+    return PipelineTestStage(code=pipeline_spv)
+
+
+@pytest.fixture
+def comp(pipeline_stage) -> PipelineTestStage:
+    # reset params and output of previous tests
+    pipeline_stage.setParams(m=0, b=0)
+    for i in range(2):
+        pipeline_stage.update(i)
+    hp.execute(hp.clearTensor(pipeline_stage.tensor))
+    return pipeline_stage
+
+
+def test_pipeline(comp):
     # create pipeline
-    comp = PipelineTestStage()
     retr = pl.RetrieveTensorStage(comp.tensor)
     pipeline = pl.Pipeline([comp, retr])
 
@@ -93,24 +122,14 @@ def test_pipeline():
 
     # check result
     expected = np.arange(256) * 2.0 + 15.0
-    assert np.all(retr.view(1, np.int32) == expected)
+    np.testing.assert_array_equal(retr.view(1, np.int32), expected)
 
 
-def test_scheduler():
+def test_scheduler(comp):
     # create pipeline
-    comp = PipelineTestStage()
     retr = pl.RetrieveTensorStage(comp.tensor)
     pipeline = pl.Pipeline([comp, retr])
 
-    # create processing function
-    results = []
-
-    def process(i: int, n: int):
-        results.append(retr.view(i, np.int32).copy())
-
-    # create scheduler
-    scheduler = pl.PipelineScheduler(pipeline, processFn=process)
-
     # create two list of tasks
     m1 = [2 * x + 1 for x in range(5)]
     b1 = [50 * (x + 1) for x in range(5)]
@@ -121,6 +140,19 @@ def test_scheduler():
     t2 = [{"test__m": m2[i], "b": b2[i]} for i in range(len(m2))]
     N = len(t1) + len(t2)
 
+    # create processing function
+    # copy into a ring of preallocated slots instead of allocating per task
+    # slots get reused after len(results) tasks, so here it holds all of them
+    results = np.empty((N, 256), np.int32)
+    processed = []
+
+    def process(i: int, n: int):
+        np.copyto(results[n % len(results)], retr.view(i, np.int32))
+        processed.append(n)
+
+    # create scheduler
+    scheduler = pl.PipelineScheduler(pipeline, processFn=process)
+
     # submit both tasks
     scheduler.schedule(t1)
     scheduler.schedule(t2)
@@ -131,15 +163,11 @@ def test_scheduler():
     scheduler.wait()
 
     # check if everything was processed
-    assert len(results) == N
+    assert processed == list(range(N))
     assert scheduler.tasksFinished == N
 
     # check results
-    for i in range(len(m1)):
-        m, b = m1[i], b1[i]
-        expected = np.arange(256) * m + b
-        assert np.all(results[i] == expected)
-    for i in range(len(m2)):
-        m, b = m2[i], b2[i]
-        expected = np.arange(256) * m + b
-        assert np.all(results[i + len(m1)] == expected)
+    x = np.arange(256, dtype=np.int32)
+    expected = np.outer(m1 + m2, x) + np.array(b1 + b2)[:, None]
+    for i in range(N):
+        np.testing.assert_array_equal(results[i], expected[i])
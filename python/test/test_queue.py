@@ -1,7 +1,10 @@
+import hephaistos as hp
 import numpy as np
 
+from hephaistos import ArrayBuffer, ArrayTensor
 from hephaistos.queue import *
 from ctypes import *
+from io import BytesIO
 
 
 class Header(Structure):
@@ -25,6 +28,54 @@ def test_queueSize():
     )
 
 
+def test_alignedQueue():
+    # a: 100 * 4 -> 128 * 4 bytes, v: 3 * 100 * 4 -> 3 * 128 * 4 bytes
+    size_queue = 5 * 128 * 4
+    # counter is padded to align as well
+    assert queueSize(Item, 100, align=128) == size_queue + 128
+    assert queueSize(Item, 128, align=128) == size_queue + 128
+    assert queueSize(Item, 100, header=Header, align=128) == size_queue + 128
+
+    buf = QueueBuffer(Item, 100, skipCounter=True, align=128)
+    assert buf.size_bytes == size_queue
+    view = buf.view
+    assert view.capacity == 100
+    assert view.fieldCapacity("v") == 128
+    # check fields start at aligned offsets
+    base = view["a"].ctypes.data
+    assert view["b"].ctypes.data - base == 128 * 4
+    assert view["v"].ctypes.data - base == 2 * 128 * 4
+    assert view["b"].shape == (100,)
+    assert view["v"].shape == (100, 3)
+
+    np.copyto(
+        view["v"], np.arange(300, dtype=np.float32).reshape((-1, 3)), casting="no"
+    )
+    np.testing.assert_array_equal(view["v"], np.arange(300).reshape((-1, 3)))
+
+    # padding makes capacity ambiguous -> as_queue picks the largest one
+    assert as_queue(buf, Item, skipCounter=True, align=128).capacity == 128
+    # views of the same memory are reused
+    view = as_queue(buf, Item, skipCounter=True, align=128)
+    assert as_queue(buf, Item, skipCounter=True, align=128) is view
+    assert as_queue(buf, Item, skipCounter=True, align=16) is not view
+
+    # fields are aligned relative to the start of the queue incl. header
+    buf = QueueBuffer(Item, 100, header=Header, align=128)
+    view = buf.view
+    assert view["a"].ctypes.data - buf.address == 128
+    assert view["b"].ctypes.data - buf.address == 128 + 128 * 4
+    assert addressof(view.header) == buf.address
+    assert as_queue(buf, Item, header=Header, align=128).capacity == 128
+
+    # items with internal padding
+    class Padded(Structure):
+        _fields_ = [("a", c_uint8), ("b", c_uint32)]
+
+    buf = QueueBuffer(Padded, 100, align=16)
+    assert as_queue(buf, Padded, align=16).capacity == 100
+
+
 def test_QueueBuffer():
     buf = QueueBuffer(Item, 100, skipCounter=True)
     assert buf.size_bytes == queueSize(Item, 100, skipCounter=True)
@@ -38,21 +89,50 @@ def test_QueueBuffer():
 
     view = buf.view
     assert view.fields == {name for name, _ in Item._fields_}
+    # scalars are plain arrays, arrays are stored element wise
+    assert view["b"].flags.c_contiguous
+    assert view["v"].flags.f_contiguous
 
     view.header.u = 32
     assert view.header.u == 32
     view.header.f = 5.0
     assert view.header.f == 5.0
 
-    view["b"][:] = np.arange(100)
-    assert (view["b"] == np.arange(100)).all()
-    view["v"][:] = np.arange(300).reshape((-1, 3))
-    assert (view["v"] == np.arange(300).reshape((-1, 3))).all()
+    np.copyto(view["b"], np.arange(100, dtype=np.float32), casting="no")
+    np.testing.assert_array_equal(view["b"], np.arange(100))
+    np.copyto(
+        view["v"], np.arange(300, dtype=np.float32).reshape((-1, 3)), casting="no"
+    )
+    np.testing.assert_array_equal(view["v"], np.arange(300).reshape((-1, 3)))
 
     view["v"][10:20, :2] = 5.0
     exp = np.arange(300).reshape((-1, 3))
     exp[10:20, :2] = 5.0
-    assert (view["v"] == exp).all()
+    np.testing.assert_array_equal(view["v"], exp)
+
+
+def test_QueueSubView():
+    buf = QueueBuffer(Item, 100)
+    view = buf.view
+    np.copyto(view["b"], np.arange(100, dtype=np.float32), casting="no")
+
+    sub = view[10:50:2]
+    assert len(sub) == 20
+    np.testing.assert_array_equal(sub["b"], np.arange(10, 50, 2))
+    mask = sub["b"] > 30.0
+    masked = sub[mask]
+    assert len(masked) == mask.sum()
+    np.testing.assert_array_equal(masked["b"], np.arange(32, 50, 2))
+    assert len(view[np.array([1, 5, 7])]) == 3
+    assert len(view[5]) == 1
+
+    # chained masks should write through to the original view
+    chained = view[view["b"] > 50.0][::2]
+    assert len(chained) == 25
+    np.testing.assert_array_equal(chained["b"], np.arange(51, 100, 2))
+    chained["b"] = -1.0
+    np.testing.assert_array_equal(view["b"][51::2], -1.0)
+    np.testing.assert_array_equal(view["b"][52::2], np.arange(52, 100, 2))
 
 
 def test_QueueTensor():
@@ -67,35 +147,73 @@ def test_QueueTensor():
     assert ten.capacity == 100
 
 
+def test_copyQueue():
+    buffer = QueueBuffer(Item, 100)
+    queue = buffer.view
+    np.copyto(queue["b"], np.arange(100, dtype=np.float32), casting="no")
+    np.copyto(
+        queue["v"], np.arange(300, dtype=np.float32).reshape((-1, 3)), casting="no"
+    )
+    np.copyto(queue["a"], np.arange(100, dtype=np.uint32), casting="no")
+    queue.count = 80
+
+    # same layout
+    copyBuffer = QueueBuffer(Item, 100)
+    copy = copyBuffer.view
+    copy.copyFrom(queue)
+    for field in queue.fields:
+        np.testing.assert_array_equal(copy[field], queue[field])
+    assert copy.count == 80
+
+    # different capacity
+    smallBuffer = QueueBuffer(Item, 50)
+    small = smallBuffer.view
+    small.copyFrom(queue)
+    for field in queue.fields:
+        np.testing.assert_array_equal(small[field], queue[field][:50])
+    assert small.count == 50
+
+
 def test_dumpQueue():
     buffer = QueueBuffer(Item, 100)
     queue = buffer.view
 
-    queue["b"][:] = np.arange(100)
-    queue["v"][:] = np.arange(300).reshape((-1, 3))
+    np.copyto(queue["b"], np.arange(100, dtype=np.float32), casting="no")
+    np.copyto(
+        queue["v"], np.arange(300, dtype=np.float32).reshape((-1, 3)), casting="no"
+    )
     queue["v"][10:20, :2] = 5.0
-    queue["a"][:] = np.arange(100).astype(np.uint32)
+    np.copyto(queue["a"], np.arange(100, dtype=np.uint32), casting="no")
     queue.count = 100
 
     dump = dumpQueue(queue)
 
     assert dump.keys() == queue.fields
     for field in queue.fields:
-        assert (dump[field] == queue[field]).all()
+        np.testing.assert_array_equal(dump[field], queue[field])
+
+    # test tuple variant
+    dumpTuple = dumpQueue(queue, asTuple=True)
+    assert type(dumpTuple) is type(dumpQueue(queue, asTuple=True))
+    assert dumpTuple._fields == tuple(name for name, _ in Item._fields_)
+    np.testing.assert_array_equal(dumpTuple.v, queue["v"])
 
     # test if independent copy
     queue["b"][:] += 1000.0
     assert (dump["b"] != queue["b"]).all()
+    assert (dumpTuple.b != queue["b"]).all()
 
 
 def test_updateQueue():
     buffer = QueueBuffer(Item, 100)
     queue = buffer.view
 
-    queue["b"][:] = np.arange(100)
-    queue["v"][:] = np.arange(300).reshape((-1, 3))
+    np.copyto(queue["b"], np.arange(100, dtype=np.float32), casting="no")
+    np.copyto(
+        queue["v"], np.arange(300, dtype=np.float32).reshape((-1, 3)), casting="no"
+    )
     queue["v"][10:20, :2] = 5.0
-    queue["a"][:] = np.arange(100).astype(np.uint32)
+    np.copyto(queue["a"], np.arange(100, dtype=np.uint32), casting="no")
     queue.count = 100
 
     dump = dumpQueue(queue)
@@ -105,12 +223,50 @@ def test_updateQueue():
     copy = copyBuffer.view
     updateQueue(copy, dump)
 
-    assert (copy["b"] == queue["b"]).all()
-    assert (copy["v"] == queue["v"]).all()
+    np.testing.assert_array_equal(copy["b"], queue["b"])
+    np.testing.assert_array_equal(copy["v"], queue["v"])
     assert (copy["a"] != queue["a"]).any()
     assert copy.count == queue.count
 
 
+def test_updateQueueFromAoS():
+    items = ArrayBuffer(Item, 50)
+    data = items.numpy()
+    data["a"] = np.arange(50)
+    data["b"] = np.arange(50) * 2.0
+    data["v"] = np.arange(150).reshape((-1, 3))
+
+    buffer = QueueBuffer(Item, 100)
+    updateQueueFromAoS(buffer, data)
+
+    queue = buffer.view
+    assert queue.count == 50
+    for field in queue.fields:
+        np.testing.assert_array_equal(queue[field][:50], data[field])
+
+
+def test_scatterQueue():
+    items = ArrayBuffer(Item, 50)
+    data = items.numpy()
+    data["a"] = np.arange(50)
+    data["b"] = np.arange(50) * 2.0
+    data["v"] = np.arange(150).reshape((-1, 3))
+    tensor = ArrayTensor(Item, 50)
+    hp.execute(hp.updateTensor(items, tensor))
+
+    # different layouts of the same item share a single program
+    for capacity, align in ((64, 1), (100, 128)):
+        queueTensor = QueueTensor(Item, capacity, header=Header, align=align)
+        queueBuffer = QueueBuffer(Item, capacity, header=Header, align=align)
+        hp.execute(scatterQueue(tensor, queueTensor, 50))
+        hp.execute(hp.retrieveTensor(queueTensor, queueBuffer))
+
+        queue = queueBuffer.view
+        assert queue.count == 50
+        for field in queue.fields:
+            np.testing.assert_array_equal(queue[field][:50], data[field])
+
+
 def test_queueSerialization(tmp_path):
     file = tmp_path / "test.bin"
 
@@ -120,10 +276,12 @@ def test_queueSerialization(tmp_path):
     queue.header.u = 32
     queue.header.f = -10.0
 
-    queue["b"][:] = np.arange(100)
-    queue["v"][:] = np.arange(300).reshape((-1, 3))
+    np.copyto(queue["b"], np.arange(100, dtype=np.float32), casting="no")
+    np.copyto(
+        queue["v"], np.arange(300, dtype=np.float32).reshape((-1, 3)), casting="no"
+    )
     queue["v"][10:20, :2] = 5.0
-    queue["a"][:] = np.arange(100).astype(np.uint32)
+    np.copyto(queue["a"], np.arange(100, dtype=np.uint32), casting="no")
     queue.count = 100
 
     saveQueue(file, buffer)
@@ -132,9 +290,37 @@ def test_queueSerialization(tmp_path):
     loadQueue(file, copyBuf)
     copy = copyBuf.view
 
-    assert (copy["b"] == queue["b"]).all()
-    assert (copy["v"] == queue["v"]).all()
-    assert (copy["a"] == queue["a"]).all()
+    np.testing.assert_array_equal(copy["b"], queue["b"])
+    np.testing.assert_array_equal(copy["v"], queue["v"])
+    np.testing.assert_array_equal(copy["a"], queue["a"])
     assert copy.count == queue.count
     assert copy.header.u == queue.header.u
     assert copy.header.f == queue.header.f
+
+    # only count items are saved
+    queue.count = 60
+    saveQueue(file, buffer, compressed=True)
+    loadQueue(file, copyBuf)
+    assert copy.count == 60
+    np.testing.assert_array_equal(copy["v"][:60], queue["v"][:60])
+
+    # raw serialization
+    queue.count = 70
+    saveQueue(file, buffer, raw=True)
+    rawBuf = QueueBuffer(Item, 100, header=Header)
+    loadQueue(file, rawBuf, raw=True)
+    raw = rawBuf.view
+    assert raw.count == 70
+    assert raw.header.u == queue.header.u
+    for field in queue.fields:
+        np.testing.assert_array_equal(raw[field][:70], queue[field][:70])
+
+    # raw format can be loaded into different layouts and from streams
+    with open(file, "rb") as f:
+        data = BytesIO(f.read())
+    alignBuf = QueueBuffer(Item, 80, header=Header, align=16)
+    loadQueueRaw(data, alignBuf)
+    aligned = alignBuf.view
+    assert aligned.count == 70
+    for field in queue.fields:
+        np.testing.assert_array_equal(aligned[field][:70], queue[field][:70])
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from hephaistos.util import *
+from ctypes import *
+
+
+class Vec(Structure):
+    _fields_ = [("x", c_float), ("y", c_float)]
+
+
+class Item(Structure):
+    _fields_ = [("a", c_uint32), ("pos", Vec), ("v", c_float * 2)]
+
+
+def test_printSize():
+    assert printSize(0) == "0B"
+    assert printSize(512) == "512.0 B"
+    assert printSize(1024) == "1.0 KB"
+    assert printSize(1536) == "1.5 KB"
+    assert printSize(3 << 20) == "3.0 MB"
+    assert printSize(5 << 60) == "5120.0 PB"
+
+
+def test_collectFields():
+    fields = collectFields(Item)
+    assert [name for name, _ in fields] == ["a", "pos.x", "pos.y", "v[0]", "v[1]"]
+    assert collectFields(Item) is fields
+
+
+def test_createFlatType():
+    Flat = createFlatType(Item)
+    assert sizeof(Flat) == sizeof(Item)
+    # flat type should be stable across calls
+    assert createFlatType(Item) is Flat
+    buffer = ArrayBuffer(Item, 10)
+    assert type(buffer.flatarray[0]) is Flat
+
+
+def test_ArrayBuffer_numpy():
+    buffer = ArrayBuffer(Item, 10)
+    arr = buffer.numpy()
+    assert arr.shape == (10,)
+    arr["a"] = np.arange(10)
+    arr["pos"]["y"] = -1.0
+    assert buffer[4].a == 4
+    assert buffer[7].pos.y == -1.0
+    flat = buffer.numpy(flat=True)
+    assert (flat["a"] == np.arange(10)).all()
+    assert (flat["pos.y"] == -1.0).all()
+    # bulk assignment from numpy arrays
+    data = np.zeros(5, dtype=arr.dtype)
+    data["v"] = [[1.0, 2.0]] * 5
+    buffer[2:7] = data
+    assert buffer[2].v[1] == 2.0
+    assert buffer[6].a == 0
+    assert buffer[7].a == 7
+    # arrays of other types are not broadcast into every field
+    with pytest.raises(TypeError):
+        buffer[0:2] = np.zeros(2)
+    assert buffer[1].a == 1
+    # bulk copy of raw bytes
+    other = ArrayBuffer(Item, 10)
+    other[:] = buffer
+    assert bytes(other) == bytes(buffer)
+    other[1:2] = bytes(buffer[8])
+    assert other[1].a == 8
+    assert other[1].pos.y == -1.0
+
+
+def test_StructureBuffer():
+    buffer = StructureBuffer(Item)
+    assert buffer.size_bytes == sizeof(Item)
+    buffer.a = 12
+    buffer.pos.y = -2.0
+    buffer.v[1] = 8.0
+    data = Item.from_address(buffer.address)
+    assert data.a == 12
+    assert data.pos.y == -2.0
+    assert data.v[1] == 8.0
+    # struct shares the same memory
+    assert buffer.struct.a == 12
+    buffer.struct.pos.x = 3.0
+    assert buffer.pos.x == 3.0
+    # specialized class is created once per structure
+    assert isinstance(buffer, StructureBuffer)
+    assert type(StructureBuffer(Item)) is type(buffer)
+    # non field attributes are not allowed
+    with pytest.raises(AttributeError):
+        buffer.foo = 5
+
+    # fields must not shadow buffer attributes
+    class Sized(Structure):
+        _fields_ = [("size", c_uint32), ("x", c_float)]
+
+    # subclasses are free to choose their own signature
+    class VecBuffer(StructureBuffer):
+        def __init__(self, x: float = 0.0) -> None:
+            super().__init__(Vec)
+            self.x = x
+
+    vec = VecBuffer(4.0)
+    assert isinstance(vec, VecBuffer)
+    assert vec.struct.x == 4.0
+    vec.y = -1.0
+    assert vec.struct.y == -1.0
+    assert type(VecBuffer()) is type(vec)
+
+    sized = StructureBuffer(Sized)
+    sized.struct.size = 100
+    sized.x = 2.0
+    assert sized.size == sizeof(Sized)
+    assert sized.struct.x == 2.0